@@ -1,5 +1,6 @@
 from __future__ import annotations
 from typing import Dict, Any, Optional
+from functools import lru_cache
 from pathlib import Path
 import json
 
@@ -27,8 +28,18 @@ mcp = FastMCP(
     port=5000,
 )
 
-rag_tools = RAGTools()
-doc_tools = DocGeneratorTools()
+
+# Tools dibuat saat pertama dipakai, bukan saat import: worker konversi PDF
+# (start method "spawn") meng-import ulang modul ini, dan RAGTools membuka
+# LanceDB serta memanggil model embedding saat inisialisasi.
+@lru_cache(maxsize=None)
+def get_rag_tools() -> RAGTools:
+    return RAGTools()
+
+
+@lru_cache(maxsize=None)
+def get_doc_tools() -> DocGeneratorTools:
+    return DocGeneratorTools()
 
 
 # ---------------------------------------------------------------------------
@@ -69,7 +80,7 @@ def ingest_product_knowledge_tool(
         Dict[str, Any]: Sebuah dictionary yang berisi status dari proses
             ingestion. Contoh: {"status": "Product knowledge ingestion selesai."}
     """
-    result = rag_tools.add_product_knowledge(base_dir, project_name, tahun)
+    result = get_rag_tools().add_product_knowledge(base_dir, project_name, tahun)
     return {"status": "Product knowledge ingestion selesai.", "result": result}
 
 
@@ -110,7 +121,7 @@ def ingest_kak_tor_knowledge_tool(
         Dict[str, Any]: Sebuah dictionary yang mengonfirmasi penyelesaian proses.
             Contoh: {"status": "KAK/TOR ingestion selesai."}
     """
-    result = rag_tools.add_kak_tor_knowledge(project=project, tahun=tahun)
+    result = get_rag_tools().add_kak_tor_knowledge(project=project, tahun=tahun)
     return {"status": "KAK/TOR ingestion selesai.", "result": result}
 
 
@@ -157,7 +168,9 @@ def ingest_kak_tor_summaries_knowledge_tool(
         Dict[str, Any]: Sebuah dictionary yang berisi hasil dari proses
             ingestion, seperti jumlah file yang berhasil diindeks.
     """
-    result = rag_tools.add_kak_tor_summaries_knowledge(markdown_name, project, tahun)
+    result = get_rag_tools().add_kak_tor_summaries_knowledge(
+        markdown_name, project, tahun
+    )
     return {"status": "Ingest Markdown Summaries selesai.", "result": result}
 
 
@@ -231,7 +244,7 @@ def build_summary_tender_payload_tool(
     files = [f.name for f in base.glob("*.md")]
 
     try:
-        result = rag_tools.build_summary_tender_payload(
+        result = get_rag_tools().build_summary_tender_payload(
             prompt_instruction_name, kak_tor_md_name
         )
 
@@ -287,7 +300,7 @@ def rag_retrieval_tool(
         Dict[str, Any]: Sebuah dictionary yang berisi hasil pencarian.
             Kunci 'result' akan berisi daftar dokumen yang relevan.
     """
-    result = rag_tools.retrieval_with_filter(query, k, metadata_filter)
+    result = get_rag_tools().retrieval_with_filter(query, k, metadata_filter)
     return {"result": result}
 
 
@@ -332,7 +345,7 @@ def generate_proposal_docx_tool(
             - Jika berhasil: `{"status": "success", "product": "...", "path": "..."}`
             - Jika gagal: `{"status": "failure", "error": "..."}`
     """
-    return doc_tools.generate_proposal(context, override_template)
+    return get_doc_tools().generate_proposal(context, override_template)
 
 
 # ---------------------------------------------------------------------------
@@ -360,7 +373,7 @@ def get_template_placeholders_tool() -> Dict[str, Any]:
             - Jika berhasil: `{"status": "success", "placeholders": ["key1", "key2"]}`
             - Jika gagal: `{"status": "failure", "error": "<pesan_error>"}`
     """
-    return doc_tools.get_template_placeholders()
+    return get_doc_tools().get_template_placeholders()
 
 
 # ---------------------------------------------------------------------------
@@ -34,6 +34,7 @@ class Settings(BaseSettings):
     summary_output_directory: str = "mcp_server/data/summaries"
     proposal_template_path: str = "mcp_server/data/templates/proposals/proposal_template.docx"
     proposal_generate_path: str = "mcp_server/data/proposal_generated"
+    conversion_cache_path: str = "mcp_server/data/cache/docling"
     knowledge_source_extensions: List[str] = [".pdf", ".md"]
 
     # Pengaturan chunking & retrieval
@@ -1,13 +1,197 @@
+import hashlib
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from importlib.metadata import version
 from pathlib import Path
-from typing import List, Dict, Tuple, Optional, Any
+from typing import List, Dict, Tuple, Optional, Any, Iterator
 
+import pyarrow as pa
+import pyarrow.compute as pc
 from docling.document_converter import DocumentConverter
-
-from mcp_server.utils.rag_pipeline import RAGPipeline
+from docling_core.types.doc import DoclingDocument
+
+from mcp_server.utils.rag_pipeline import (
+    RAGPipeline,
+    ChunkMetadata,
+    _build_filter_expr,
+    _empty_chunk_columns,
+    _sql_literal,
+)
 from mcp_server.utils.logger import logger
 from mcp_server.settings import Settings
 
 
+# Jumlah chunk yang ditampung sebelum ditulis ke vectorstore saat ingestion
+_FLUSH_SIZE = 256
+
+# Versi docling ikut menjadi key cache konversi, sehingga hasil converter
+# versi lama tidak dipakai ulang setelah upgrade
+_DOCLING_VERSION = version("docling")
+
+# Batas worker konversi PDF: docling sudah multithread per dokumen dan tiap
+# worker memuat model sendiri, jadi lebih banyak worker hanya menambah memori
+_MAX_CONVERT_WORKERS = 4
+
+# Converter milik worker process, diisi oleh `_init_worker` sekali per worker
+_worker_converter: Optional[DocumentConverter] = None
+
+
+def _init_worker() -> None:
+    """
+    Initializer ProcessPoolExecutor: buat satu DocumentConverter per worker
+    agar model/pipeline docling tidak dimuat ulang untuk setiap PDF.
+    """
+    global _worker_converter
+    _worker_converter = DocumentConverter()
+
+
+def _convert_cached(
+    converter: DocumentConverter, source: Path, cache_dir: Optional[str] = None
+) -> DoclingDocument:
+    """
+    Konversi dokumen dengan cache on-disk yang di-key hash konten file dan
+    versi docling, sehingga file yang sama tidak di-parse ulang pada ingestion
+    berikutnya. Entry cache yang rusak dikonversi ulang dan ditimpa.
+
+    Args:
+        converter (DocumentConverter): Converter yang dipakai saat cache miss.
+        source (Path): File sumber (PDF/Markdown).
+        cache_dir (Optional[str]): Direktori cache; None berarti tanpa cache.
+
+    Returns:
+        DoclingDocument: Dokumen hasil konversi (dari cache atau baru).
+    """
+    if cache_dir is None:
+        return converter.convert(source=str(source)).document
+
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(_DOCLING_VERSION.encode("utf-8"))
+    hasher.update(source.read_bytes())
+    cache_file = Path(cache_dir) / f"{hasher.hexdigest()}.json"
+    if cache_file.is_file():
+        try:
+            return DoclingDocument.load_from_json(cache_file)
+        except Exception as e:
+            # Entry rusak/tidak kompatibel: konversi ulang dan timpa cache
+            logger.warning(f"Cache konversi '{cache_file.name}' tidak valid: {e}")
+
+    document = converter.convert(source=str(source)).document
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    # Tulis ke file sementara lalu rename agar worker lain tidak membaca file parsial
+    tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        document.save_as_json(tmp_file)
+        os.replace(tmp_file, cache_file)
+    except Exception as e:
+        # Gagal menulis cache tidak menggagalkan konversi
+        logger.warning(f"Gagal menyimpan cache konversi '{cache_file.name}': {e}")
+    finally:
+        tmp_file.unlink(missing_ok=True)
+    return document
+
+
+def _convert_pdf(
+    pdf_path: str,
+    md_dir: Optional[str] = None,
+    cache_dir: Optional[str] = None,
+    converter: Optional[DocumentConverter] = None,
+):
+    """
+    Konversi satu PDF (top-level agar bisa di-pickle ke worker process).
+
+    Args:
+        pdf_path (str): Path file PDF.
+        md_dir (Optional[str]): Jika diisi, hasil juga diekspor ke Markdown di sini.
+        cache_dir (Optional[str]): Direktori cache hasil konversi.
+        converter (Optional[DocumentConverter]): Converter yang dipakai; default
+            converter milik worker.
+
+    Returns:
+        Dokumen docling hasil konversi.
+    """
+    converter = converter or _worker_converter or DocumentConverter()
+    document = _convert_cached(converter, Path(pdf_path), cache_dir)
+    if md_dir is not None:
+        out_md = Path(md_dir) / f"{Path(pdf_path).stem}.md"
+        out_md.write_text(document.export_to_markdown(), encoding="utf-8")
+    return document
+
+
+def _dir_size(path: str) -> int:
+    """
+    Hitung total ukuran file (byte) di bawah `path` secara rekursif memakai
+    os.scandir, yang memanfaatkan info tipe file dari readdir.
+    """
+    try:
+        it = os.scandir(path)
+    except FileNotFoundError:
+        return 0
+
+    total = 0
+    with it:
+        for entry in it:
+            # File bisa terhapus saat scan (mis. compaction LanceDB): lewati saja
+            try:
+                if entry.is_file(follow_symlinks=False):
+                    total += entry.stat(follow_symlinks=False).st_size
+                elif entry.is_dir(follow_symlinks=False):
+                    total += _dir_size(entry.path)
+            except FileNotFoundError:
+                continue
+    return total
+
+
+@lru_cache(maxsize=64)
+def _read_text_cached(path: str, mtime: float) -> str:
+    return Path(path).read_text(encoding="utf-8")
+
+
+def _load_text(path: str) -> str:
+    """
+    Baca file teks (template/markdown) dengan cache in-memory.
+    Cache di-key dengan mtime sehingga otomatis invalid ketika file diubah.
+    """
+    return _read_text_cached(path, os.path.getmtime(path))
+
+
+@lru_cache(maxsize=64)
+def _read_md_context_cached(path: str, mtime: float) -> str:
+    md_path = Path(path)
+    header = f"---\n# {md_path.name}\n".encode("utf-8")
+    return b"".join((header, md_path.read_bytes(), b"\n")).decode("utf-8")
+
+
+def _load_md_context(path: str) -> str:
+    """
+    Rakit blok context Markdown (header nama file + isi) dalam satu kali
+    decode dari bytes; hasil di-cache dengan key mtime seperti `_load_text`.
+    """
+    return _read_md_context_cached(path, os.path.getmtime(path))
+
+
+@lru_cache(maxsize=8)
+def _md_index_cached(
+    path: str, mtime: float
+) -> Tuple[Dict[str, Path], Dict[str, Path]]:
+    entries = {p.stem: p for p in Path(path).iterdir() if p.suffix == ".md"}
+    return entries, {k.lower(): v for k, v in entries.items()}
+
+
+def _md_index(path: str) -> Tuple[Dict[str, Path], Dict[str, Path]]:
+    """
+    Index file .md di sebuah direktori: (stem -> path, stem lowercase -> path).
+    Di-cache dengan key mtime direktori, yang berubah saat file ditambah,
+    dihapus, atau di-rename, sehingga pemanggilan berulang tidak membaca
+    ulang direktori.
+    """
+    if not os.path.isdir(path):
+        return {}, {}
+    return _md_index_cached(path, os.path.getmtime(path))
+
+
 class RAGTools:
     def __init__(self):
         """
@@ -15,6 +199,94 @@ class RAGTools:
         """
         self.settings = Settings()  # type: ignore
         self.pipeline = RAGPipeline()
+        self._converter: Optional[DocumentConverter] = None
+
+    def _get_converter(self) -> DocumentConverter:
+        """
+        Mengembalikan DocumentConverter yang di-cache (dibuat saat pertama dipakai).
+        """
+        if self._converter is None:
+            self._converter = DocumentConverter()
+        return self._converter
+
+    def _convert_pdfs(
+        self, pdf_files: List[Path], md_dir: Optional[Path] = None
+    ) -> Iterator[Tuple[Path, Any, Optional[Exception]]]:
+        """
+        Konversi banyak PDF secara paralel dengan ProcessPoolExecutor. Satu PDF
+        dikonversi langsung di proses ini tanpa membuat pool.
+
+        Args:
+            pdf_files (List[Path]): Daftar file PDF.
+            md_dir (Optional[Path]): Direktori ekspor Markdown (opsional).
+
+        Yields:
+            Tuple[Path, Any, Optional[Exception]]: (pdf, dokumen, error) sesuai
+            urutan selesai; dokumen bernilai None jika konversi gagal.
+        """
+        md_arg = str(md_dir) if md_dir is not None else None
+        cache_dir = self.settings.conversion_cache_path
+        if len(pdf_files) == 1:
+            pdf = pdf_files[0]
+            try:
+                document = _convert_pdf(
+                    str(pdf), md_arg, cache_dir, self._get_converter()
+                )
+            except Exception as e:
+                yield pdf, None, e
+            else:
+                yield pdf, document, None
+            return
+
+        max_workers = min(_MAX_CONVERT_WORKERS, os.cpu_count() or 1, len(pdf_files))
+        # LanceDB tidak fork-safe (thread runtime native sudah aktif), jadi
+        # worker dibuat dengan start method "spawn"
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        ) as executor:
+            futures = {
+                executor.submit(_convert_pdf, str(pdf), md_arg, cache_dir): pdf
+                for pdf in pdf_files
+            }
+            for future in as_completed(futures):
+                pdf = futures[future]
+                try:
+                    yield pdf, future.result(), None
+                except Exception as e:
+                    yield pdf, None, e
+
+    def _flush_chunks(
+        self, buffer: Dict[str, List[Any]], sources: List[str], failed: List[str]
+    ) -> int:
+        """
+        Menulis buffer chunk hasil ingestion ke vectorstore lalu mengosongkannya.
+        Jika penulisan gagal, batch dibuang (tidak di-retry) agar kegagalan
+        tidak berulang di setiap flush berikutnya; file sumber di batch tersebut
+        dicatat ke `failed` supaya pemanggil bisa melaporkan kegagalan.
+
+        Args:
+            buffer (Dict[str, List[Any]]): Chunk kolumnar yang menunggu ditulis.
+            sources (List[str]): Nama file yang chunk-nya ada di buffer.
+            failed (List[str]): Penampung nama file yang gagal ditulis.
+
+        Returns:
+            int: Jumlah chunk yang berhasil ditulis.
+        """
+        try:
+            return self.pipeline._add_chunk_columns(buffer)
+        except Exception as e:
+            logger.error(
+                f"Gagal menulis {len(buffer['text'])} chunk ke vectorstore, "
+                f"batch dibuang. File terdampak: {sources}. Error: {e}"
+            )
+            failed.extend(sources)
+            return 0
+        finally:
+            for values in buffer.values():
+                values.clear()
+            sources.clear()
 
     def add_product_knowledge(
         self,
@@ -40,25 +312,37 @@ class RAGTools:
             logger.warning(f"Tidak ada PDF di {base_dir}.")
             return
 
-        entries = []
-        for pdf in pdf_files:
+        buffer = _empty_chunk_columns()
+        sources: List[str] = []
+        failed: List[str] = []
+        total = 0
+        for pdf, document, error in self._convert_pdfs(pdf_files):
+            if error is not None:
+                logger.error(f"Gagal proses '{pdf.name}': {error}")
+                continue
             try:
-                result = DocumentConverter().convert(source=str(pdf))
                 chunks = self.pipeline._chunk_document(
-                    result.document, pdf.name, project_name, tahun
+                    document, pdf.name, project_name, tahun
                 )
-                entries.extend(chunks)
-                logger.info(f"'{pdf.name}' siap diindeks sebagai product knowledge.")
             except Exception as e:
                 logger.error(f"Gagal proses '{pdf.name}': {e}")
-
-        if entries:
-            self.pipeline.table.add(entries)
-            logger.info(
-                f"{len(entries)} chunk product knowledge ditambahkan ke vectorstore."
-            )
+                continue
+            for key, values in chunks.items():
+                buffer[key].extend(values)
+            sources.append(pdf.name)
+            logger.info(f"'{pdf.name}' siap diindeks sebagai product knowledge.")
+            if len(buffer["text"]) >= _FLUSH_SIZE:
+                total += self._flush_chunks(buffer, sources, failed)
+        total += self._flush_chunks(buffer, sources, failed)
+
+        if total:
+            logger.info(f"{total} chunk product knowledge ditambahkan ke vectorstore.")
         else:
             logger.info("Tidak ada chunk product knowledge yang ditambahkan.")
+        if failed:
+            raise RuntimeError(
+                f"Gagal menulis chunk product knowledge ke vectorstore untuk file: {failed}"
+            )
 
     def add_kak_tor_knowledge(
         self,
@@ -92,31 +376,41 @@ class RAGTools:
             logger.warning(f"Tidak ada PDF di {base_dir}.")
             return
 
-        entries = []
-        for pdf in pdf_files:
+        buffer = _empty_chunk_columns()
+        sources: List[str] = []
+        failed: List[str] = []
+        total = 0
+        # Konversi + ekspor Markdown berjalan paralel di worker process
+        for pdf, document, error in self._convert_pdfs(pdf_files, md_path):
+            if error is not None:
+                logger.error(f"Gagal proses KAK/TOR '{pdf.name}': {error}")
+                continue
+            logger.info(
+                f"'{pdf.name}' diekspor ke Markdown: {md_path / f'{pdf.stem}.md'}"
+            )
             try:
-                # Konversi ke markdown
-                result = DocumentConverter().convert(source=str(pdf))
-                md_content = result.document.export_to_markdown()
-
-                # Simpan markdown
-                out_md = md_path / f"{pdf.stem}.md"
-                out_md.write_text(md_content, encoding="utf-8")
-                logger.info(f"'{pdf.name}' diekspor ke Markdown: {out_md}")
-
                 # Chunk dan indeks Markdown
                 chunks = self.pipeline._chunk_document(
-                    result.document, pdf.name, project or "kak_tor", tahun or "2025"
+                    document, pdf.name, project or "kak_tor", tahun or "2025"
                 )
-                entries.extend(chunks)
             except Exception as e:
                 logger.error(f"Gagal proses KAK/TOR '{pdf.name}': {e}")
-
-        if entries:
-            self.pipeline.table.add(entries)
-            logger.info(f"{len(entries)} chunk KAK/TOR ditambahkan ke vectorstore.")
+                continue
+            for key, values in chunks.items():
+                buffer[key].extend(values)
+            sources.append(pdf.name)
+            if len(buffer["text"]) >= _FLUSH_SIZE:
+                total += self._flush_chunks(buffer, sources, failed)
+        total += self._flush_chunks(buffer, sources, failed)
+
+        if total:
+            logger.info(f"{total} chunk KAK/TOR ditambahkan ke vectorstore.")
         else:
             logger.info("Tidak ada chunk KAK/TOR yang ditambahkan.")
+        if failed:
+            raise RuntimeError(
+                f"Gagal menulis chunk KAK/TOR ke vectorstore untuk file: {failed}"
+            )
 
     def add_kak_tor_summaries_knowledge(
         self,
@@ -133,8 +427,9 @@ class RAGTools:
             tahun (str): Metadata tahun.
         """
         base = Path(self.settings.summaries_md_base_path)
-        # Daftar semua .md yang tersedia
-        available_files = [p.name for p in base.glob("*.md")]
+        # Index stem -> path untuk semua .md yang tersedia (di-cache per mtime)
+        entries, lower = _md_index(str(base))
+        available_files = [p.name for p in entries.values()]
 
         if not markdown_name:
             logger.warning(
@@ -144,18 +439,14 @@ class RAGTools:
             return
 
         name_stem = markdown_name.strip()
-        # Kandidat: exact, normalized, contains
-        candidates = [
-            base / f"{name_stem}.md",
-            base / f"{name_stem.lower().replace(' ', '_')}.md",
-        ]
-        # fallback: any file yang stem-nya mengandung name_stem (case-insensitive)
-        candidates += [
-            p for p in base.glob("*.md") if name_stem.lower() in p.stem.lower()
-        ]
-
-        # Pilih file pertama yang ada
-        file_path = next((p for p in candidates if p.exists()), None)
+        # Kandidat: exact, case-insensitive, normalized, lalu fallback
+        # file yang stem-nya mengandung name_stem (case-insensitive)
+        file_path = (
+            entries.get(name_stem)
+            or lower.get(name_stem.lower())
+            or lower.get(name_stem.lower().replace(" ", "_"))
+            or next((v for k, v in lower.items() if name_stem.lower() in k), None)
+        )
 
         if not file_path:
             logger.warning(
@@ -167,15 +458,17 @@ class RAGTools:
         # Proses hanya file_path
         try:
             # Convert markdown ke dokumen dan chunk
-            result = DocumentConverter().convert(source=str(file_path))
+            document = _convert_cached(
+                self._get_converter(),
+                file_path,
+                self.settings.conversion_cache_path,
+            )
             chunks = self.pipeline._chunk_document(
-                result.document, file_path.name, project, tahun
+                document, file_path.name, project, tahun
             )
-            if chunks:
-                self.pipeline.table.add(chunks)
-                logger.info(
-                    f"{len(chunks)} chunk dari '{file_path.name}' berhasil diindeks."
-                )
+            if chunks["text"]:
+                count = self.pipeline._add_chunk_columns(chunks)
+                logger.info(f"{count} chunk dari '{file_path.name}' berhasil diindeks.")
             else:
                 logger.warning(
                     f"Tidak ada chunk yang dihasilkan dari '{file_path.name}'."
@@ -203,7 +496,7 @@ class RAGTools:
         """
         # Baca template
         tmpl_path = Path(self.settings.templates_base_path) / f"{template_name}.txt"
-        template = tmpl_path.read_text(encoding="utf-8")
+        template = _load_text(str(tmpl_path))
 
         # Kumpulkan konten markdown
         if kak_md_dir is None:
@@ -214,13 +507,27 @@ class RAGTools:
         else:
             files = list(md_base.glob("*.md"))
 
-        contexts = []
-        for md in files:
-            text = md.read_text(encoding="utf-8")
-            contexts.append(f"---\n# {md.name}\n{text}\n")
+        # Baca markdown secara konkuren (I/O-bound), urutan tetap terjaga;
+        # untuk 0-1 file dibaca langsung tanpa thread pool
+        if len(files) <= 1:
+            texts = [md.read_text(encoding="utf-8") for md in files]
+        else:
+            with ThreadPoolExecutor(max_workers=min(8, len(files))) as executor:
+                texts = list(
+                    executor.map(lambda p: p.read_text(encoding="utf-8"), files)
+                )
 
-        # Gabungkan
-        combined_context = "\n".join(contexts)
+        # Gabungkan langsung ke satu buffer (tanpa list string perantara)
+        buf = io.StringIO()
+        for i, (md, text) in enumerate(zip(files, texts)):
+            if i:
+                buf.write("\n")
+            buf.write("---\n# ")
+            buf.write(md.name)
+            buf.write("\n")
+            buf.write(text)
+            buf.write("\n")
+        combined_context = buf.getvalue()
 
         instruksi = template
         return instruksi, combined_context
@@ -253,7 +560,7 @@ class RAGTools:
             raise FileNotFoundError(
                 f"Template instruction tidak ditemukan: {tmpl_path}"
             )
-        instruction = tmpl_path.read_text(encoding="utf-8")
+        instruction = _load_text(str(tmpl_path))
 
         # 2. direktori default KAK/TOR (tidak berubah-ubah)
         md_base: Path = Path(self.settings.kak_tor_md_base_path)
@@ -275,8 +582,7 @@ class RAGTools:
             )
 
         # 4. baca markdown
-        md_text = md_path.read_text(encoding="utf-8")
-        context = f"---\n# {md_path.name}\n{md_text}\n"
+        context = _load_md_context(str(md_path))
 
         return {"instruction": instruction, "context": context}
 
@@ -321,45 +627,52 @@ class RAGTools:
 
         Returns:
             int: Jumlah chunk yang diupdate.
+
+        Raises:
+            ValueError: Jika `new_metadata` berisi key di luar schema ChunkMetadata.
         """
+        unknown = set(new_metadata) - set(ChunkMetadata.model_fields)
+        if unknown:
+            raise ValueError(
+                f"Field metadata tidak dikenal: {sorted(unknown)}. "
+                f"Field yang tersedia: {list(ChunkMetadata.model_fields)}"
+            )
+
         # Build filter expression
-        clauses = []
-        for k, v in metadata_filter.items():
-            val = f"'{v}'" if isinstance(v, str) else v
-            clauses.append(f"metadata.{k} = {val}")
-        filter_expr = " AND ".join(clauses)
-
-        # Ambil semua chunk yang sesuai
-        df = (
-            self.pipeline.table.search([0] * self.pipeline.vector_dim)
-            .where(filter_expr)
-            .limit(None)
-            .to_pandas()
-        )
-        if df.empty:
-            return 0
+        filter_expr = _build_filter_expr(metadata_filter)
 
-        # Hapus chunk lama dan siapkan entry baru dengan metadata terbarukan
-        try:
-            self.pipeline.table.delete(filter_expr)
-        except Exception:
-            logger.warning(
-                "Tidak dapat menghapus chunk lama via filter, coba lanjutkan overwrite."
-            )
+        # Hitung chunk yang sesuai tanpa menarik data ke Python
+        total = self.pipeline.table.count_rows(filter_expr)
+        if total == 0:
+            return 0
 
-        updated_entries = []
-        for _, row in df.iterrows():
-            merged_meta = {**row["metadata"], **new_metadata}
-            updated_entries.append(
-                {
-                    "text": row["text"],
-                    "vector": row["vector"],
-                    "metadata": merged_meta,
-                }
+        # Merge metadata langsung di LanceDB: field yang tidak diubah tetap
+        # memakai nilai lama, sehingga vektor tidak pernah keluar dari store
+        fields = []
+        for name in ChunkMetadata.model_fields:
+            value = (
+                _sql_literal(new_metadata[name])
+                if name in new_metadata
+                else f"metadata.{name}"
             )
+            fields.append(f"'{name}', {value}")
+        self.pipeline.table.update(
+            where=filter_expr,
+            values_sql={"metadata": f"named_struct({', '.join(fields)})"},
+        )
+        return total
 
-        self.pipeline.table.add(updated_entries)
-        return len(updated_entries)
+    def _metadata_column(self) -> pa.ChunkedArray:
+        """
+        Mengambil kolom `metadata` saja (tanpa text/vector) sebagai Arrow array.
+        """
+        return (
+            self.pipeline.table.search()
+            .select(["metadata"])
+            .limit(None)
+            .to_arrow()
+            .column("metadata")
+        )
 
     def get_vectorstore_stats(self) -> Dict[str, Any]:
         """
@@ -367,20 +680,17 @@ class RAGTools:
         """
         total = self.pipeline.table.count_rows()
         # Hitung ukuran folder persist_dir
-        base = Path(self.pipeline.persist_dir)
-        size_bytes = sum(f.stat().st_size for f in base.rglob("*") if f.is_file())
+        size_bytes = _dir_size(str(self.pipeline.persist_dir))
         size_mb = size_bytes / (1024 * 1024)
-        # Ambil metadata untuk analisis
-        df = self.pipeline.table.to_pandas()
-        projects = (
-            df["metadata"].apply(lambda m: m.get("project")).dropna().unique().tolist()
-        )
-        tahun_dist = (
-            df["metadata"]
-            .apply(lambda m: m.get("tahun"))
-            .dropna()
-            .value_counts()
-            .to_dict()
+        # Ambil hanya kolom metadata dan agregasi dengan kernel pyarrow
+        meta = self._metadata_column()
+        projects = pc.unique(pc.struct_field(meta, "project")).drop_null().to_pylist()
+        counts = pc.value_counts(pc.struct_field(meta, "tahun").drop_null())
+        tahun_dist = dict(
+            zip(
+                counts.field("values").to_pylist(),
+                counts.field("counts").to_pylist(),
+            )
         )
         return {
             "total_rows": total,
@@ -396,22 +706,37 @@ class RAGTools:
         Args:
             batch_size (int): Jumlah chunk yang diproses per batch.
         """
-        df = self.pipeline.table.to_pandas()
-        entries = []
-        for _, row in df.iterrows():
-            vec = self.pipeline.embed.embed_query(row["text"])
-            self.pipeline._validate_vector_dim(vec)
-            entries.append(
-                {
-                    "text": row["text"],
-                    "vector": list(vec),
-                    "metadata": row["metadata"],
-                }
+        staging_name = f"{self.pipeline.collection_name}_rebuild"
+        staging = self.pipeline.create_staging_table(staging_name)
+
+        # Stream per batch: hanya text & metadata yang dibaca (vektor lama
+        # tidak diperlukan), sehingga memori puncak ~ batch_size chunk
+        reader = (
+            self.pipeline.table.search()
+            .select(["text", "metadata"])
+            .limit(None)
+            .to_batches(batch_size)
+        )
+        total = 0
+        for batch in reader:
+            texts = batch.column("text").to_pylist()
+            if not texts:
+                continue
+            # Dimensi seluruh vektor divalidasi per batch di _to_record_batch
+            vectors = self.pipeline.embed.embed_documents(texts)
+            staging.add(
+                self.pipeline._to_record_batch(
+                    texts,
+                    vectors,
+                    batch.column("metadata").to_pylist(),
+                    schema=staging.schema,
+                )
             )
-        # Reset and re-add
-        self.pipeline.reset_vectorstore()
-        self.pipeline.table.add(entries)
-        logger.info(f"Rebuild embeddings selesai: {len(entries)} chunk diperbarui.")
+            total += len(texts)
+
+        # Tabel lama baru diganti setelah semua batch berhasil di-embed
+        self.pipeline.swap_table(staging_name, batch_size)
+        logger.info(f"Rebuild embeddings selesai: {total} chunk diperbarui.")
 
     def list_metadata_values(self, field: str) -> List[Any]:
         """
@@ -423,6 +748,8 @@ class RAGTools:
         Returns:
             List[Any]: Daftar unik nilai.
         """
-        df = self.pipeline.table.to_pandas()
-        values = df["metadata"].apply(lambda m: m.get(field)).dropna().unique().tolist()
+        meta = self._metadata_column()
+        if meta.type.get_field_index(field) == -1:
+            return []
+        values = pc.unique(pc.struct_field(meta, field)).drop_null().to_pylist()
         return values
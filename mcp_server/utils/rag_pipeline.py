@@ -1,7 +1,10 @@
+import math
 from pathlib import Path
 from typing import List, Optional, Dict, Any
 
 import lancedb
+import pyarrow as pa
+import pyarrow.compute as pc
 from lancedb.pydantic import LanceModel, Vector
 from pydantic import BaseModel
 
@@ -36,6 +39,65 @@ def build_chunks_schema(vector_dim: int):
     return Chunks
 
 
+def _sql_literal(value: Any) -> str:
+    """
+    Mengubah nilai Python menjadi literal SQL untuk ekspresi LanceDB.
+    String di-quote dengan tanda kutip tunggal (apostrof di-escape).
+
+    Raises:
+        ValueError: Jika `value` berupa float non-finite (NaN/inf).
+    """
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, float) and not math.isfinite(value):
+        raise ValueError(f"Nilai float non-finite tidak didukung: {value}")
+    if isinstance(value, (int, float)):
+        return str(value)
+    escaped = str(value).replace("'", "''")
+    return f"'{escaped}'"
+
+
+def _build_filter_expr(metadata_filter: Dict[str, Any]) -> str:
+    """
+    Merakit ekspresi filter LanceDB dari dict metadata.
+
+    Args:
+        metadata_filter (Dict[str, Any]): Filter metadata, misal
+            {"project": "Alpha", "tahun": "2025"}; nilai list/tuple menjadi IN-clause.
+
+    Returns:
+        str: Ekspresi filter dengan literal yang sudah di-quote dengan benar.
+
+    Raises:
+        ValueError: Jika ada key di luar schema ChunkMetadata.
+    """
+    unknown = set(metadata_filter) - set(ChunkMetadata.model_fields)
+    if unknown:
+        raise ValueError(
+            f"Field filter metadata tidak dikenal: {sorted(unknown)}. "
+            f"Field yang tersedia: {list(ChunkMetadata.model_fields)}"
+        )
+
+    clauses: List[str] = []
+    for field, val in metadata_filter.items():
+        key = f"metadata.{field}"
+        if isinstance(val, (list, tuple)):
+            items = ", ".join(_sql_literal(v) for v in val)
+            clauses.append(f"{key} IN ({items})")
+        else:
+            clauses.append(f"{key} = {_sql_literal(val)}")
+    return " AND ".join(clauses)
+
+
+def _empty_chunk_columns() -> Dict[str, List[Any]]:
+    """
+    Buffer chunk kolumnar kosong: list paralel `text`, `vector`, dan `metadata`.
+    """
+    return {"text": [], "vector": [], "metadata": []}
+
+
 class RagQuery(BaseModel):
     question: str
 
@@ -120,12 +182,83 @@ class RAGPipeline:
                 f"Dimensi vektor salah: embedding={len(vector)}, store={self.vector_dim}"
             )
 
+    def _validate_vector_batch(self, vectors: pa.ListArray, dim: int):
+        """
+        Validasi dimensi seluruh vektor dalam satu batch sekaligus dengan
+        kernel pyarrow (tanpa loop Python per baris).
+
+        Args:
+            vectors (pa.ListArray): Vektor embedding satu batch.
+            dim (int): Dimensi yang diharapkan tabel tujuan.
+
+        Raises:
+            ValueError: Jika ada vektor yang panjangnya tidak sama dengan `dim`.
+        """
+        lengths = pc.min_max(pc.list_value_length(vectors))
+        for length in (lengths["min"].as_py(), lengths["max"].as_py()):
+            if length is not None and length != dim:
+                raise ValueError(
+                    f"Dimensi vektor salah: embedding={length}, store={dim}"
+                )
+
+    def _to_record_batch(
+        self,
+        texts: List[str],
+        vectors: List[List[float]],
+        metas: List[Dict[str, Any]],
+        schema: Optional[pa.Schema] = None,
+    ) -> pa.RecordBatch:
+        """
+        Menyusun RecordBatch Arrow kolumnar dari list paralel text, vector, dan
+        metadata, sehingga `table.add` tidak perlu mengonversi dict per baris.
+
+        Args:
+            texts (List[str]): Teks tiap chunk.
+            vectors (List[List[float]]): Vektor embedding tiap chunk.
+            metas (List[Dict[str, Any]]): Metadata tiap chunk.
+            schema (Optional[pa.Schema]): Schema tujuan; default schema tabel koleksi.
+
+        Returns:
+            pa.RecordBatch: Batch sesuai schema tabel tujuan.
+        """
+        schema = schema or self.table.schema
+        vector_type = schema.field("vector").type
+        lists = pa.array(vectors, type=pa.list_(vector_type.value_type))
+        self._validate_vector_batch(lists, vector_type.list_size)
+        return pa.RecordBatch.from_arrays(
+            [
+                pa.array(texts, type=schema.field("text").type),
+                pa.FixedSizeListArray.from_arrays(lists.flatten(), type=vector_type),
+                pa.array(metas, type=schema.field("metadata").type),
+            ],
+            schema=schema,
+        )
+
+    def _add_chunk_columns(self, chunks: Dict[str, List[Any]]) -> int:
+        """
+        Menulis chunk kolumnar ke tabel koleksi sebagai satu RecordBatch.
+
+        Args:
+            chunks (Dict[str, List[Any]]): List paralel `text`, `vector`, `metadata`.
+
+        Returns:
+            int: Jumlah chunk yang ditulis.
+        """
+        count = len(chunks["text"])
+        if count:
+            self.table.add(
+                self._to_record_batch(
+                    chunks["text"], chunks["vector"], chunks["metadata"]
+                )
+            )
+        return count
+
     def _chunk_document(
         self, dl_doc, filename: str, project: str, tahun: str
-    ) -> List[Dict[str, Any]]:
+    ) -> Dict[str, List[Any]]:
         """
         Memecah dokumen menjadi potongan (chunk), menghitung embedding untuk tiap chunk,
-        dan menyiapkan struktur entri untuk diindeks.
+        dan menyiapkan kolom paralel untuk diindeks.
 
         Args:
             dl_doc: Objek dokumen dari DocumentConverter.
@@ -134,29 +267,26 @@ class RAGPipeline:
             tahun (str): Tahun untuk metadata.
 
         Returns:
-            List[Dict[str, Any]]: Daftar entri dengan keys `text`, `vector`, dan `metadata`.
+            Dict[str, List[Any]]: List paralel `text`, `vector`, dan `metadata`.
         """
         chunker = HybridChunker(merge_peers=True)
         chunks = chunker.chunk(dl_doc=dl_doc)
-        entries = []
+        columns = _empty_chunk_columns()
         for idx, chunk in enumerate(chunks):
             text = chunk.text
-            vec = self.embed.embed_query(text)
-            self._validate_vector_dim(vec)
-            entries.append(
+            columns["text"].append(text)
+            # Dimensi divalidasi sekali per batch di `_to_record_batch`
+            columns["vector"].append(self.embed.embed_query(text))
+            columns["metadata"].append(
                 {
-                    "text": text,
-                    "vector": list(vec),
-                    "metadata": {
-                        "filename": filename,
-                        "source": filename,
-                        "chunk_index": idx,
-                        "project": project,
-                        "tahun": tahun,
-                    },
+                    "filename": filename,
+                    "source": filename,
+                    "chunk_index": idx,
+                    "project": project,
+                    "tahun": tahun,
                 }
             )
-        return entries
+        return columns
 
     # —————————————————————————————————————————
     #  Ingest semua PDF di folder
@@ -185,12 +315,13 @@ class RAGPipeline:
             logger.warning("Tidak ada PDF di knowledge_base_path.")
             return
 
-        to_add = []
+        to_add = _empty_chunk_columns()
         for path in pdf_files:
             filename = path.name
             # skip jika sudah ada
             exists = (
-                self.table.count_rows(filter=f"metadata.filename = '{filename}'") > 0
+                self.table.count_rows(filter=_build_filter_expr({"filename": filename}))
+                > 0
             )
             if exists:
                 logger.debug(f"Skip '{filename}', sudah terindeks.")
@@ -198,16 +329,16 @@ class RAGPipeline:
 
             try:
                 result = DocumentConverter().convert(source=str(path))
-                to_add.extend(
-                    self._chunk_document(result.document, filename, project, tahun)
-                )
+                chunks = self._chunk_document(result.document, filename, project, tahun)
+                for key, values in chunks.items():
+                    to_add[key].extend(values)
                 logger.info(f"'{filename}' dipecah dan siap diindeks.")
             except Exception as e:
                 logger.warning(f"Gagal proses '{filename}': {e}")
 
-        if to_add:
-            self.table.add(to_add)
-            logger.info(f"{len(to_add)} chunk ditambahkan ke vectorstore.")
+        count = self._add_chunk_columns(to_add)
+        if count:
+            logger.info(f"{count} chunk ditambahkan ke vectorstore.")
         else:
             logger.info("Tidak ada chunk baru untuk diindeks.")
 
@@ -237,9 +368,9 @@ class RAGPipeline:
 
         try:
             result = DocumentConverter().convert(source=path)
-            entries = self._chunk_document(result.document, path.name, project, tahun)
-            self.table.add(entries)
-            msg = f"{len(entries)} chunk dari '{path.name}' diindeks."
+            chunks = self._chunk_document(result.document, path.name, project, tahun)
+            count = self._add_chunk_columns(chunks)
+            msg = f"{count} chunk dari '{path.name}' diindeks."
             logger.info(msg)
             return {"message": msg}
         except Exception as e:
@@ -262,6 +393,42 @@ class RAGPipeline:
         )
         logger.info("Vectorstore di-reset dan tabel baru dibuat.")
 
+    def create_staging_table(self, name: str):
+        """
+        Membuat (atau menimpa) tabel sementara dengan schema chunk saat ini,
+        dipakai untuk rebuild sebelum menggantikan tabel koleksi.
+
+        Args:
+            name (str): Nama tabel sementara.
+        """
+        Chunks = build_chunks_schema(self.vector_dim)
+        return self.db.create_table(name, schema=Chunks, mode="overwrite")
+
+    def swap_table(self, staging_name: str, batch_size: int = 1024):
+        """
+        Mengganti tabel koleksi dengan isi tabel `staging_name`, lalu menghapus
+        tabel sementara. LanceDB lokal tidak mendukung rename tabel, sehingga
+        data disalin per batch tanpa menampung seluruh isi tabel di memori.
+        Penggantian memakai mode "overwrite" yang di-commit Lance sebagai versi
+        baru secara atomik: jika penyalinan gagal, koleksi lama tetap utuh dan
+        tabel sementara tidak dihapus.
+
+        Args:
+            staging_name (str): Nama tabel sementara hasil rebuild.
+            batch_size (int): Jumlah baris per batch saat penyalinan.
+        """
+        staging = self.db.open_table(staging_name)
+        Chunks = build_chunks_schema(self.vector_dim)
+        self.table = self.db.create_table(
+            self.collection_name,
+            data=staging.search().limit(None).to_batches(batch_size),
+            schema=Chunks,
+            mode="overwrite",
+        )
+        # Tabel sementara baru dihapus setelah overwrite berhasil di-commit
+        self.db.drop_table(staging_name)
+        logger.info(f"Tabel '{staging_name}' menggantikan '{self.collection_name}'.")
+
     # —————————————————————————————————————————
     #  Retrieval
     # —————————————————————————————————————————
@@ -291,26 +458,13 @@ class RAGPipeline:
         q_vec = self.embed.embed_query(query)
         self._validate_vector_dim(q_vec)
 
-        # 2. mulai build pencarian
-        builder = self.table.search(list(q_vec))
+        # 2. mulai build pencarian; hanya text & metadata yang diambil
+        #    (vektor tidak diperlukan untuk menyusun citation)
+        builder = self.table.search(list(q_vec)).select(["text", "metadata"])
 
-        # 3. kalau ada metadata_filter, rakit string .where(...)
+        # 3. kalau ada metadata_filter, filter dijalankan sebelum vector search
         if metadata_filter:
-            clauses: List[str] = []
-            for field, val in metadata_filter.items():
-                key = f"metadata.{field}"
-                # kalau list/tuple → IN‐clause
-                if isinstance(val, (list, tuple)):
-                    items = ", ".join(f"'{v}'" for v in val)
-                    clauses.append(f"{key} IN ({items})")
-                else:
-                    # asumsi string atau number
-                    if isinstance(val, str):
-                        clauses.append(f"{key} = '{val}'")
-                    else:
-                        clauses.append(f"{key} = {val}")
-            filter_expr = " AND ".join(clauses)
-            builder = builder.where(filter_expr)
+            builder = builder.where(_build_filter_expr(metadata_filter), prefilter=True)
 
         # 4. limit dan ambil pandas DataFrame
         df = builder.limit(top_k).to_pandas()
@@ -323,14 +477,14 @@ class RAGPipeline:
 
         # 5. format jawaban dengan citation metadata
         contexts = []
-        for _, row in df.iterrows():
-            meta = row["metadata"] or {}
+        for text, meta in zip(df["text"].tolist(), df["metadata"].tolist()):
+            meta = meta or {}
             citation = (
                 f"[{meta.get('filename', '')}"
                 f" - {meta.get('project', '')}"
                 f" - {meta.get('tahun', '')}]"
             )
-            contexts.append(f"{row['text']}\n\nSumber: {citation}")
+            contexts.append(f"{text}\n\nSumber: {citation}")
 
         logger.info(
             f"{len(contexts)} hasil retrieval untuk '{query}' dengan filter {metadata_filter}."